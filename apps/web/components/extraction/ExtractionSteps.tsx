@@ -115,7 +115,9 @@ export const ExtractionSteps = ({ categories, marques, fournisseurs }: Extractio
       if (parsed.activePdf) setActivePdf(parsed.activePdf);
 
       // Restore annotated PDF URL if exists
-      if (parsed.result?.annotatedPdfBase64) {
+      if (parsed.result?.annotatedPdfUrl) {
+        setAnnotatedPreviewUrl(parsed.result.annotatedPdfUrl);
+      } else if (parsed.result?.annotatedPdfBase64) {
         const annotatedUrl = convertBase64PdfToUrl(parsed.result.annotatedPdfBase64);
         setAnnotatedPreviewUrl(annotatedUrl);
       }
@@ -198,9 +200,9 @@ export const ExtractionSteps = ({ categories, marques, fournisseurs }: Extractio
     });
     setArticles(result.articles.length ? result.articles : [emptyArticle]);
 
-    const annotatedUrl = result.annotatedPdfBase64
-      ? convertBase64PdfToUrl(result.annotatedPdfBase64)
-      : null;
+    const annotatedUrl =
+      result.annotatedPdfUrl ??
+      (result.annotatedPdfBase64 ? convertBase64PdfToUrl(result.annotatedPdfBase64) : null);
 
     setAnnotatedPreviewUrl((prev) => {
       if (prev && prev.startsWith("blob:")) {
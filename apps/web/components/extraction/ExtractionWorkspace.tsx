@@ -140,6 +140,8 @@ export const ExtractionWorkspace = ({ categories, marques, fournisseurs }: Extra
       if (persistedState.annotatedPdfBase64) {
         const annotatedUrl = base64ToUrl(persistedState.annotatedPdfBase64);
         setAnnotatedPreviewUrl(annotatedUrl);
+      } else if (persistedState.result?.annotatedPdfUrl) {
+        setAnnotatedPreviewUrl(persistedState.result.annotatedPdfUrl);
       }
 
       // Restore UI state
@@ -236,9 +238,9 @@ export const ExtractionWorkspace = ({ categories, marques, fournisseurs }: Extra
       setMetadataColors(result.colorMapping.metadata_colors);
     }
 
-    const annotatedUrl = result.annotatedPdfBase64
-      ? convertBase64PdfToUrl(result.annotatedPdfBase64)
-      : null;
+    const annotatedUrl =
+      result.annotatedPdfUrl ??
+      (result.annotatedPdfBase64 ? convertBase64PdfToUrl(result.annotatedPdfBase64) : null);
 
     setAnnotatedPreviewUrl((prev) => {
       if (prev && prev.startsWith("blob:")) {
@@ -42,6 +42,7 @@ export interface ExtractionResponse {
   structured: StructuredInvoice;
   articles: ArticleRow[];
   annotatedPdfBase64?: string | null;
+  annotatedPdfUrl?: string | null;
   fileName?: string | null;
   colorMapping?: ColorMapping;
 }
@@ -0,0 +1,75 @@
+"""In-process response caches shared by the API routers."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Hashable
+
+
+class UserTTLCache:
+    """Small thread-safe cache whose entries are scoped to a user and expire after ``ttl`` seconds.
+
+    Entries are keyed by ``(user_id, key)`` so every entry of a user can be dropped at once
+    when their data changes. Each drop bumps the user's generation: read it before computing
+    a value and pass it to ``set`` so results computed across a write are not stored.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024) -> None:
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._entries: dict[tuple[str, Hashable], tuple[float, Any]] = {}
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def generation(self, user_id: str) -> int:
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def get(self, user_id: str, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[(user_id, key)]
+                return None
+            return value
+
+    def set(self, user_id: str, key: Hashable, value: Any, generation: int | None = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            # User data changed while the value was being computed
+            if generation is not None and generation != self._generations.get(user_id, 0):
+                return
+            if len(self._entries) >= self._maxsize:
+                self._evict(now)
+            self._entries[(user_id, key)] = (now + self._ttl, value)
+
+    def clear_user(self, user_id: str) -> None:
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for cache_key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[cache_key]
+
+    def _evict(self, now: float) -> None:
+        expired = [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for cache_key in expired:
+            del self._entries[cache_key]
+        # Still full: drop the oldest insertion
+        while len(self._entries) >= self._maxsize:
+            del self._entries[next(iter(self._entries))]
+
+
+# Dashboard analytics change at most a few times a day per user
+dashboard_cache = UserTTLCache(ttl=60)
+
+# Known categories/brands fed to the extraction prompt, only grow when invoices are saved
+vocabulary_cache = UserTTLCache(ttl=300)
+
+
+def invalidate_user_caches(user_id: str) -> None:
+    """Drop cached responses derived from a user's invoices and products."""
+    dashboard_cache.clear_user(user_id)
+    vocabulary_cache.clear_user(user_id)
@@ -14,7 +14,7 @@ from src.invoice_analyst.adapters.supabase_client import get_supabase_client
 load_dotenv()
 
 
-@dataclass(slots=True)
+@dataclass(frozen=True, slots=True)
 class Settings:
     supabase_url: str
     supabase_key: str
@@ -22,10 +22,10 @@ class Settings:
     api_key: str | None = None
     invoices_bucket: str = "invoices"
     cors_origins: List[str] | None = None
+    extraction_cache_dir: str | None = None
 
 
-@lru_cache(maxsize=1)
-def get_settings() -> Settings:
+def _build_settings() -> Settings:
     try:
         cors_raw = os.environ.get(
             "CORS_ALLOW_ORIGINS", "http://localhost:3000,http://localhost:3001"
@@ -34,6 +34,9 @@ def get_settings() -> Settings:
         if not cors_origins:
             cors_origins = ["*"]
 
+        # The on-disk extraction cache stores invoice contents, it is opt-in
+        extraction_cache_dir = os.environ.get("EXTRACTION_CACHE_DIR", "")
+
         return Settings(
             supabase_url=os.environ["SUPABASE_URL"],
             supabase_key=os.environ["SUPABASE_KEY"],
@@ -41,17 +44,28 @@ def get_settings() -> Settings:
             api_key=os.environ.get("API_KEY"),
             invoices_bucket=os.environ.get("SUPABASE_INVOICES_BUCKET", "invoices"),
             cors_origins=cors_origins,
+            extraction_cache_dir=extraction_cache_dir or None,
         )
     except KeyError as exc:
         missing = ", ".join(sorted({key for key in exc.args}))
         raise RuntimeError(f"Missing required environment variables: {missing}") from exc
 
 
+# Read the environment once at import, settings never change while the process runs
+SETTINGS = _build_settings()
+
+
+def get_settings() -> Settings:
+    return SETTINGS
+
+
+@lru_cache(maxsize=1)
 def get_supabase():
     settings = get_settings()
     return get_supabase_client(settings.supabase_url, settings.supabase_key)
 
 
+@lru_cache(maxsize=1)
 def get_mistral() -> MistralAdapter:
     settings = get_settings()
     return MistralAdapter(api_key=settings.mistral_api_key)
@@ -2,42 +2,64 @@
 
 from __future__ import annotations
 
-from fastapi import Request, Response
+import hmac
+
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from ..config import get_settings
 
+PUBLIC_PATHS = frozenset({"/", "/health", "/docs", "/openapi.json", "/redoc", "/debug/cors"})
+
+
+class APIKeyMiddleware:
+    """Pure ASGI middleware to validate API key for protected endpoints.
 
-class APIKeyMiddleware(BaseHTTPMiddleware):
-    """Middleware to validate API key for protected endpoints."""
+    Avoids ``BaseHTTPMiddleware``, which runs every request in an extra task and
+    memory stream.
+    """
 
-    PUBLIC_PATHS = {"/", "/health", "/docs", "/openapi.json", "/redoc", "/debug/cors"}
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        # Compare raw header bytes against the pre-encoded key
+        self._expected_key = (get_settings().api_key or "").encode()
 
-    async def dispatch(self, request: Request, call_next) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Validate API key before processing request."""
-        settings = get_settings()
+        # Only HTTP requests carry the API key (lifespan events pass through)
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
         # Skip API key check for CORS preflight requests
-        if request.method == "OPTIONS":
-            return await call_next(request)
+        if scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
 
         # Skip API key check for public paths
-        if request.url.path in self.PUBLIC_PATHS:
-            return await call_next(request)
+        if scope["path"] in PUBLIC_PATHS:
+            await self.app(scope, receive, send)
+            return
 
         # Skip API key check if no API key is configured (local dev)
-        if not settings.api_key:
-            return await call_next(request)
+        if not self._expected_key:
+            await self.app(scope, receive, send)
+            return
 
-        # Get API key from header
-        api_key = request.headers.get("X-API-Key")
+        # Get API key from header (ASGI header names are lowercased bytes)
+        api_key = None
+        for name, value in scope["headers"]:
+            if name == b"x-api-key":
+                api_key = value
+                break
 
         # Validate API key
-        if not api_key or api_key != settings.api_key:
-            return JSONResponse(
+        if not api_key or not hmac.compare_digest(api_key, self._expected_key):
+            response = JSONResponse(
                 status_code=401,
                 content={"detail": "Invalid or missing API key"},
             )
+            await response(scope, receive, send)
+            return
 
-        return await call_next(request)
+        await self.app(scope, receive, send)
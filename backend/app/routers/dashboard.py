@@ -2,10 +2,14 @@
 
 from __future__ import annotations
 
-from datetime import date, timedelta, datetime
+import asyncio
+from datetime import date, timedelta
+from heapq import nlargest
+from operator import itemgetter
 
 from fastapi import APIRouter, Depends, HTTPException
 
+from ..cache import dashboard_cache
 from ..config import get_supabase
 from ..schemas.dashboard import (
     GlobalDashboardRequest,
@@ -19,6 +23,30 @@ from ..schemas.dashboard import (
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 
+async def _fetch(query) -> list[dict]:
+    """Run a blocking Supabase query in a worker thread and return its rows."""
+    result = await asyncio.to_thread(query.execute)
+    return result.data or []
+
+
+async def _no_rows() -> list[dict]:
+    return []
+
+
+def _period_kpis(invoices: list[dict]) -> tuple[float, int, float, int]:
+    """Return total TTC, invoice count, average amount and active suppliers in one pass."""
+    total_ttc = 0
+    suppliers = set()
+    for inv in invoices:
+        total_ttc += inv.get("total_ttc", 0) or 0
+        supplier_id = inv.get("fournisseur_id")
+        if supplier_id:
+            suppliers.add(supplier_id)
+    invoice_count = len(invoices)
+    avg_invoice_amount = total_ttc / invoice_count if invoice_count > 0 else 0
+    return total_ttc, invoice_count, avg_invoice_amount, len(suppliers)
+
+
 @router.post(
     "/global", response_model=GlobalDashboardResponse, summary="Get global dashboard analytics"
 )
@@ -31,12 +59,19 @@ async def get_global_dashboard(
     start_date = payload.startDate
     end_date = payload.endDate
 
+    cache_key = ("global", start_date, end_date)
+    cached = dashboard_cache.get(user_id, cache_key)
+    if cached is not None:
+        return cached
+    # Invoice writes during the queries below bump it, and the result is then not cached
+    generation = dashboard_cache.generation(user_id)
+
     # Calculate previous period (same duration)
     period_duration = (end_date - start_date).days
     prev_end_date = start_date - timedelta(days=1)
     prev_start_date = prev_end_date - timedelta(days=period_duration)
 
-    # Fetch invoices for the current period
+    # Build the independent queries up front so they can run concurrently
     invoices_query = (
         supabase.table("factures")
         .select("id, date, total_ttc, fournisseur_id")
@@ -44,34 +79,54 @@ async def get_global_dashboard(
         .gte("date", str(start_date))
         .lte("date", str(end_date))
     )
-    invoices_result = invoices_query.execute()
-    invoices = invoices_result.data or []
-
-    # Fetch invoices for the previous period
+    # Previous period only feeds the KPI deltas, fetch just what _period_kpis reads
     prev_invoices_query = (
         supabase.table("factures")
-        .select("id, date, total_ttc, fournisseur_id")
+        .select("total_ttc, fournisseur_id")
         .eq("user_id", user_id)
         .gte("date", str(prev_start_date))
         .lte("date", str(prev_end_date))
     )
-    prev_invoices_result = prev_invoices_query.execute()
-    prev_invoices = prev_invoices_result.data or []
+    # Views have RLS enabled, no need for user_id filter
+    supplier_query = (
+        supabase.table("ttc_by_fournisseur_view")
+        .select("fournisseur, total_ttc, date")
+        .gte("date", str(start_date))
+        .lte("date", str(end_date))
+    )
+    products_query = (
+        supabase.table("top_products_raw_view")
+        .select("designation, quantite, date")
+        .gte("date", str(start_date))
+        .lte("date", str(end_date))
+        .limit(50)
+    )
 
-    # Calculate current period KPIs
-    total_ttc = sum(inv.get("total_ttc", 0) or 0 for inv in invoices)
-    invoice_count = len(invoices)
-    avg_invoice_amount = total_ttc / invoice_count if invoice_count > 0 else 0
-    active_suppliers = len(
-        set(inv.get("fournisseur_id") for inv in invoices if inv.get("fournisseur_id"))
+    async def fetch_invoices_and_lines() -> tuple[list[dict], list[dict]]:
+        # Lines only of the period's invoices, filtered by facture_id in Postgres
+        period_invoices = await _fetch(invoices_query)
+        invoice_ids = [inv["id"] for inv in period_invoices]
+        if not invoice_ids:
+            return period_invoices, []
+        period_lines = await _fetch(
+            supabase.table("lignes_facture")
+            .select("montant, produit_id")
+            .eq("user_id", user_id)
+            .in_("facture_id", invoice_ids)
+        )
+        return period_invoices, period_lines
+
+    (invoices, lines_data), prev_invoices, supplier_data, products_data = await asyncio.gather(
+        fetch_invoices_and_lines(),
+        _fetch(prev_invoices_query),
+        _fetch(supplier_query),
+        _fetch(products_query),
     )
 
-    # Calculate previous period KPIs
-    prev_total_ttc = sum(inv.get("total_ttc", 0) or 0 for inv in prev_invoices)
-    prev_invoice_count = len(prev_invoices)
-    prev_avg_invoice_amount = prev_total_ttc / prev_invoice_count if prev_invoice_count > 0 else 0
-    prev_active_suppliers = len(
-        set(inv.get("fournisseur_id") for inv in prev_invoices if inv.get("fournisseur_id"))
+    # Calculate current and previous period KPIs
+    total_ttc, invoice_count, avg_invoice_amount, active_suppliers = _period_kpis(invoices)
+    prev_total_ttc, prev_invoice_count, prev_avg_invoice_amount, prev_active_suppliers = (
+        _period_kpis(prev_invoices)
     )
 
     # Calculate percentage changes
@@ -85,69 +140,39 @@ async def get_global_dashboard(
     avg_invoice_amount_change = calc_change(avg_invoice_amount, prev_avg_invoice_amount)
     active_suppliers_change = calc_change(active_suppliers, prev_active_suppliers)
 
-    # Monthly totals
     from collections import defaultdict
 
+    # Monthly totals and invoice volume over time, in one pass
     monthly_totals = defaultdict(float)
+    monthly_counts = defaultdict(int)
     for inv in invoices:
         inv_date = inv.get("date")
         if inv_date:
             month_key = inv_date[:7]  # YYYY-MM format
             monthly_totals[month_key] += inv.get("total_ttc", 0) or 0
+            monthly_counts[month_key] += 1
 
     monthly_data = [
         {"month": month, "total": total} for month, total in sorted(monthly_totals.items())
     ]
-
-    # Invoice volume over time
-    monthly_counts = defaultdict(int)
-    for inv in invoices:
-        inv_date = inv.get("date")
-        if inv_date:
-            month_key = inv_date[:7]
-            monthly_counts[month_key] += 1
-
     invoice_volume = [
         {"month": month, "count": count} for month, count in sorted(monthly_counts.items())
     ]
 
-    # Supplier totals (views have RLS enabled, no need for user_id filter)
-    supplier_query = (
-        supabase.table("ttc_by_fournisseur_view")
-        .select("fournisseur, total_ttc, date")
-        .gte("date", str(start_date))
-        .lte("date", str(end_date))
-    )
-    supplier_result = supplier_query.execute()
-    supplier_data = supplier_result.data or []
-
+    # Supplier totals
     supplier_agg = defaultdict(float)
     for entry in supplier_data:
         supplier_name = entry.get("fournisseur", "Unknown")
         supplier_agg[supplier_name] += float(entry.get("total_ttc", 0) or 0)
 
-    supplier_totals = [
-        {"fournisseur": name, "total": total}
-        for name, total in sorted(supplier_agg.items(), key=lambda x: x[1], reverse=True)
-    ][:8]
-
-    # Supplier concentration (all suppliers for pie chart)
+    # Supplier concentration (all suppliers for pie chart), the top 8 reuse the same ordering
     supplier_concentration = [
         {"fournisseur": name, "total": total}
-        for name, total in sorted(supplier_agg.items(), key=lambda x: x[1], reverse=True)
+        for name, total in sorted(supplier_agg.items(), key=itemgetter(1), reverse=True)
     ]
+    supplier_totals = supplier_concentration[:8]
 
-    # Top products (views have RLS enabled, no need for user_id filter)
-    products_query = (
-        supabase.table("top_products_raw_view")
-        .select("designation, quantite, date")
-        .gte("date", str(start_date))
-        .lte("date", str(end_date))
-        .limit(50)
-    )
-    products_result = products_query.execute()
-    products_data = products_result.data or []
-
+    # Top products
     product_agg = defaultdict(float)
     for entry in products_data:
         designation = entry.get("designation", "Unknown")
@@ -155,91 +180,73 @@ async def get_global_dashboard(
 
     top_products = [
         {"designation": name, "quantite": qty}
-        for name, qty in sorted(product_agg.items(), key=lambda x: x[1], reverse=True)
-    ][:5]
+        for name, qty in nlargest(5, product_agg.items(), key=itemgetter(1))
+    ]
 
     # Brand & Category spending (join lignes_facture -> produits -> marques/categories)
-    lines_query = (
-        supabase.table("lignes_facture")
-        .select("montant, produit_id, facture_id")
-        .eq("user_id", user_id)
-    )
-    lines_result = lines_query.execute()
-    lines_data = lines_result.data or []
-
-    # Filter lines by facture_id in our date range
-    invoice_ids = {inv["id"] for inv in invoices}
-    filtered_lines = [line for line in lines_data if line.get("facture_id") in invoice_ids]
-
     # Get product -> brand/category mapping
-    product_ids = {line.get("produit_id") for line in filtered_lines if line.get("produit_id")}
+    # Sum line amounts per product in a single pass, brands/categories then roll up per product
+    product_amounts: defaultdict[int | None, float] = defaultdict(float)
+    for line in lines_data:
+        product_amounts[line.get("produit_id")] += float(line.get("montant", 0) or 0)
+    product_ids = [pid for pid in product_amounts if pid]
+    product_meta: dict[int, tuple[str | None, str]] = {}
     if product_ids:
-        products_query = (
-            supabase.table("produits")
-            .select("id, marque_id, categorie_id")
-            .in_("id", list(product_ids))
+        produits = await _fetch(
+            supabase.table("produits").select("id, marque_id, categorie_id").in_("id", product_ids)
         )
-        products_result = products_query.execute()
-        product_brand_map = {p["id"]: p.get("marque_id") for p in products_result.data or []}
-        product_category_map = {p["id"]: p.get("categorie_id") for p in products_result.data or []}
-
-        # Get brand names
-        brand_ids = {bid for bid in product_brand_map.values() if bid}
-        if brand_ids:
-            brands_query = supabase.table("marques").select("id, nom").in_("id", list(brand_ids))
-            brands_result = brands_query.execute()
-            brand_name_map = {b["id"]: b.get("nom", "Unknown") for b in brands_result.data or []}
-        else:
-            brand_name_map = {}
 
-        # Get category names
-        category_ids = {cid for cid in product_category_map.values() if cid}
-        if category_ids:
-            categories_query = (
-                supabase.table("categories").select("id, nom").in_("id", list(category_ids))
+        # Brand and category names are independent lookups
+        brand_ids = {p["marque_id"] for p in produits if p.get("marque_id")}
+        category_ids = {p["categorie_id"] for p in produits if p.get("categorie_id")}
+        marques, categories = await asyncio.gather(
+            (
+                _fetch(supabase.table("marques").select("id, nom").in_("id", list(brand_ids)))
+                if brand_ids
+                else _no_rows()
+            ),
+            (
+                _fetch(supabase.table("categories").select("id, nom").in_("id", list(category_ids)))
+                if category_ids
+                else _no_rows()
+            ),
+        )
+        brand_name_map = {b["id"]: b.get("nom", "Unknown") for b in marques}
+        category_name_map = {c["id"]: c.get("nom", "Unknown") for c in categories}
+
+        for p in produits:
+            brand_id = p.get("marque_id")
+            category_id = p.get("categorie_id")
+            brand_name = brand_name_map.get(brand_id, "Unknown") if brand_id else None
+            category_name = (
+                category_name_map.get(category_id, "Sans catégorie")
+                if category_id
+                else "Sans catégorie"
             )
-            categories_result = categories_query.execute()
-            category_name_map = {
-                c["id"]: c.get("nom", "Unknown") for c in categories_result.data or []
-            }
-        else:
-            category_name_map = {}
-    else:
-        product_brand_map = {}
-        brand_name_map = {}
-        product_category_map = {}
-        category_name_map = {}
+            product_meta[p["id"]] = (brand_name, category_name)
 
     # Aggregate by brand
     brand_spending = defaultdict(float)
     category_spending_dict = defaultdict(float)
 
-    for line in filtered_lines:
-        product_id = line.get("produit_id")
-        montant = float(line.get("montant", 0) or 0)
+    for product_id, montant in product_amounts.items():
+        brand_name, category_name = product_meta.get(product_id, (None, "Sans catégorie"))
 
         # Brand aggregation
-        brand_id = product_brand_map.get(product_id)
-        if brand_id:
-            brand_name = brand_name_map.get(brand_id, "Unknown")
+        if brand_name:
             brand_spending[brand_name] += montant
 
         # Category aggregation
-        category_id = product_category_map.get(product_id)
-        if category_id:
-            category_name = category_name_map.get(category_id, "Sans catégorie")
-            category_spending_dict[category_name] += montant
-        else:
-            category_spending_dict["Sans catégorie"] += montant
+        category_spending_dict[category_name] += montant
 
     top_brands = [
         {"marque": name, "total": total}
-        for name, total in sorted(brand_spending.items(), key=lambda x: x[1], reverse=True)
-    ][:8]
+        for name, total in nlargest(8, brand_spending.items(), key=itemgetter(1))
+    ]
 
     category_spending = [
         {"categorie": name, "total": total}
-        for name, total in sorted(category_spending_dict.items(), key=lambda x: x[1], reverse=True)
+        for name, total in sorted(category_spending_dict.items(), key=itemgetter(1), reverse=True)
     ]
 
     # Month-over-month change
@@ -253,7 +260,7 @@ async def get_global_dashboard(
     else:
         mom_change = 0.0
 
-    return GlobalDashboardResponse(
+    response = GlobalDashboardResponse(
         totalTtc=total_ttc,
         invoiceCount=invoice_count,
         avgInvoiceAmount=avg_invoice_amount,
@@ -271,6 +278,8 @@ async def get_global_dashboard(
         topBrands=top_brands,
         momChange=mom_change,
     )
+    dashboard_cache.set(user_id, cache_key, response, generation=generation)
+    return response
 
 
 @router.post(
@@ -278,7 +287,7 @@ async def get_global_dashboard(
     response_model=ProductEvolutionResponse,
     summary="Get product evolution analytics",
 )
-async def get_product_evolution(
+def get_product_evolution(
     payload: ProductEvolutionRequest,
     supabase=Depends(get_supabase),
 ):
@@ -296,6 +305,13 @@ async def get_product_evolution(
     if metric not in ["unit_price", "quantity", "amount"]:
         raise HTTPException(status_code=400, detail="Invalid metric")
 
+    cache_key = ("evolution", tuple(product_ids), metric, start_date, end_date)
+    cached = dashboard_cache.get(user_id, cache_key)
+    if cached is not None:
+        return cached
+    # Invoice writes during the queries below bump it, and the result is then not cached
+    generation = dashboard_cache.generation(user_id)
+
     # Get product details with supplier
     products_query = (
         supabase.table("produits")
@@ -329,9 +345,7 @@ async def get_product_evolution(
     # Get invoice lines with facture date
     lines_query = (
         supabase.table("lignes_facture")
-        .select(
-            "produit_id, prix_unitaire, quantite, montant, facture_id, unite, poids_volume, collisage"
-        )
+        .select("produit_id, prix_unitaire, quantite, montant, facture_id, collisage")
         .in_("produit_id", product_ids)
         .eq("user_id", user_id)
     )
@@ -401,10 +415,8 @@ async def get_product_evolution(
         monthly_data = product_monthly_data.get(product_id, {})
         data_points = []
 
-        # ✅ sort months chronologically
-        months_sorted = sorted(
-            monthly_data.items(), key=lambda kv: datetime.strptime(kv[0], "%Y-%m")
-        )
+        # ✅ sort months chronologically ("YYYY-MM" keys order lexicographically)
+        months_sorted = sorted(monthly_data.items())
 
         for month, metrics in months_sorted:
             avg_unit_price = (
@@ -445,4 +457,6 @@ async def get_product_evolution(
             )
         )
 
-    return ProductEvolutionResponse(series=series)
+    response = ProductEvolutionResponse(series=series)
+    dashboard_cache.set(user_id, cache_key, response, generation=generation)
+    return response
@@ -2,66 +2,167 @@
 
 from __future__ import annotations
 
+import asyncio
 import base64
-from datetime import date, datetime
+from datetime import date
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from pydantic import TypeAdapter
 
 from invoice_analyst.domain.models import (
     Article,
-    ExtractionResult,
     InvoiceTotals,
     StructuredInvoice,
     SupplierInfo,
+    parse_invoice_date,
 )
 from invoice_analyst.extraction.pipeline import process_pdf_pipeline
+from invoice_analyst.services.storage import (
+    annotated_pdf_path,
+    create_signed_url,
+    remove_files_older_than,
+)
 
+from ..cache import vocabulary_cache
 from ..config import Settings, get_settings, get_supabase
+from ..schemas.extraction import ExtractionResponse
 
 router = APIRouter(prefix="/extract", tags=["extraction"])
 
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Drafts are restored from localStorage, keep the annotated preview reachable for a day
+ANNOTATED_PDF_URL_TTL = 24 * 60 * 60
+
+ARTICLE_LIST_ADAPTER = TypeAdapter(list[Article])
+
+# Extractions run in worker threads, cap concurrent Mistral calls to stay under rate limits
+MAX_CONCURRENT_EXTRACTIONS = 4
+_extraction_slots = asyncio.Semaphore(MAX_CONCURRENT_EXTRACTIONS)
+
+
+async def _read_pdf_upload(file: UploadFile) -> bytes:
+    """Read the uploaded PDF chunk by chunk, rejecting bad uploads as soon as possible."""
+    # Multipart parsing already knows the size, reject oversized files without copying them
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise HTTPException(status_code=413, detail="File too large (maximum 10MB)")
+
+    chunks: list[bytes] = []
+    size = 0
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        # Validate file type (must be PDF) from the first chunk
+        if not chunks and not chunk.startswith(b"%PDF"):
+            raise HTTPException(status_code=400, detail="File must be a PDF document")
+        size += len(chunk)
+        if size > MAX_FILE_SIZE:
+            raise HTTPException(status_code=413, detail="File too large (maximum 10MB)")
+        chunks.append(chunk)
+
+    if not chunks:
+        raise HTTPException(status_code=400, detail="Uploaded file is empty")
+    return b"".join(chunks)
+
+
+def _has_negative_amount(article_data: dict) -> bool:
+    """Whether the article has a negative unit price or total."""
+    unit_price = article_data.get("Prix Unitaire")
+    total = article_data.get("Total")
+    return (unit_price is not None and unit_price < 0) or (total is not None and total < 0)
+
+
+def _distinct_names(rows: list[dict]) -> list[str]:
+    """Return non-empty names once each (case-insensitive), keeping prompt context tight."""
+    names: dict[str, str] = {}
+    for row in rows:
+        name = (row.get("nom") or "").strip()
+        if name:
+            names.setdefault(name.casefold(), name)
+    return list(names.values())
+
+
+async def _known_vocabulary(supabase, user_id: str) -> tuple[list[str], list[str]]:
+    """Return the user's category and brand names, cached for a few minutes."""
+    vocabulary = vocabulary_cache.get(user_id, "vocabulary")
+    if vocabulary is None:
+        generation = vocabulary_cache.generation(user_id)
+        # Both lookups are independent, run them concurrently in worker threads
+        categories_response, brands_response = await asyncio.gather(
+            asyncio.to_thread(
+                supabase.table("categories").select("nom").eq("user_id", user_id).execute
+            ),
+            asyncio.to_thread(
+                supabase.table("marques").select("nom").eq("user_id", user_id).execute
+            ),
+        )
+        vocabulary = (
+            _distinct_names(categories_response.data or []),
+            _distinct_names(brands_response.data or []),
+        )
+        vocabulary_cache.set(user_id, "vocabulary", vocabulary, generation=generation)
+    return vocabulary
+
+
+def _store_annotated_pdf(
+    supabase, bucket: str, user_id: str, source_pdf: bytes, annotated_pdf: bytes
+) -> str:
+    """Upload the annotated PDF and return a signed URL to it."""
+    # Keyed by the uploaded PDF, re-extracting an invoice overwrites its previous preview
+    annotated_path = annotated_pdf_path(user_id, source_pdf)
+    supabase.storage.from_(bucket).upload(
+        path=annotated_path,
+        file=annotated_pdf,
+        file_options={"content-type": "application/pdf", "upsert": "true"},
+    )
+    url = create_signed_url(
+        supabase=supabase,
+        bucket=bucket,
+        file_path=annotated_path,
+        ttl=ANNOTATED_PDF_URL_TTL,
+    )
+
+    # Previews of drafts never saved outlive their signed URL, drop them
+    try:
+        remove_files_older_than(
+            supabase=supabase,
+            bucket=bucket,
+            folder=f"{user_id}/annotated",
+            max_age=ANNOTATED_PDF_URL_TTL,
+        )
+    except Exception:
+        pass  # Retried on the user's next extraction
+
+    return url
 
-@router.post("", summary="Run invoice extraction")
+
+@router.post("", response_model=ExtractionResponse, summary="Run invoice extraction")
 async def run_extraction(
     *,
     user_id: str = Form(...),
     file: UploadFile = File(...),
+    refresh: bool = Form(False),
     supabase=Depends(get_supabase),
     settings: Settings = Depends(get_settings),
 ):
-    # Read PDF bytes
-    pdf_bytes = await file.read()
-    if not pdf_bytes:
-        raise HTTPException(status_code=400, detail="Uploaded file is empty")
-
-    # Validate file size (max 10MB)
-    MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-    if len(pdf_bytes) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=413, detail="File too large (maximum 10MB)")
+    # Read PDF bytes (validated while streaming)
+    pdf_bytes = await _read_pdf_upload(file)
 
-    # Validate file type (must be PDF)
-    if not pdf_bytes.startswith(b"%PDF"):
-        raise HTTPException(status_code=400, detail="File must be a PDF document")
-
-    # Fetch known brands and categories from database
-    categories_response = (
-        supabase.table("categories").select("nom").eq("user_id", user_id).execute()
-    )
-    categories = [row.get("nom") for row in categories_response.data or []]
-
-    brands_response = supabase.table("marques").select("nom").eq("user_id", user_id).execute()
-    brands = [row.get("nom") for row in brands_response.data or []]
+    # Fetch known brands and categories (cached per user)
+    categories, brands = await _known_vocabulary(supabase, user_id)
 
     # Process PDF with new pipeline
     templates_dir = str(Path(__file__).parent.parent.parent / "templates")
-    pipeline_result = process_pdf_pipeline(
-        pdf_input=pdf_bytes,
-        mistral_api_key=settings.mistral_api_key,
-        templates_dir=templates_dir,
-        known_brands=brands,
-        known_categories=categories,
-    )
+    async with _extraction_slots:
+        pipeline_result = await asyncio.to_thread(
+            process_pdf_pipeline,
+            pdf_input=pdf_bytes,
+            mistral_api_key=settings.mistral_api_key,
+            templates_dir=templates_dir,
+            known_brands=brands,
+            known_categories=categories,
+            cache_dir=settings.extraction_cache_dir,
+            refresh_cache=refresh,
+        )
 
     # Handle unknown supplier error
     if not pipeline_result["success"]:
@@ -89,22 +190,13 @@ async def run_extraction(
 
     # Parse invoice date
     invoice_date_str = json_data.get("invoice_date")
-    if invoice_date_str:
-        try:
-            if isinstance(invoice_date_str, str):
-                for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d"):
-                    try:
-                        invoice_date = datetime.strptime(invoice_date_str, fmt).date()
-                        break
-                    except ValueError:
-                        continue
-                else:
-                    invoice_date = date.today()
-            else:
-                invoice_date = date.today()
-        except Exception:
-            invoice_date = date.today()
-    else:
+    try:
+        invoice_date = (
+            parse_invoice_date(invoice_date_str)
+            if isinstance(invoice_date_str, str)
+            else date.today()
+        )
+    except ValueError:
         invoice_date = date.today()
 
     structured = StructuredInvoice(
@@ -118,30 +210,37 @@ async def run_extraction(
         }
     )
 
-    # Parse articles (filter out negative values)
-    articles = []
-    for article_data in json_data.get("articles", []):
-        # Skip articles with negative unit_price or total
-        unit_price = article_data.get("Prix Unitaire")
-        total = article_data.get("Total")
-        if (unit_price is not None and unit_price < 0) or (total is not None and total < 0):
-            continue
-        articles.append(Article.model_validate(article_data, from_attributes=True))
-
-    # Encode annotated PDF to base64
-    annotated_pdf_base64 = base64.b64encode(annotated_pdf_bytes).decode("utf-8")
-
-    # Build extraction result
-    extraction_result = ExtractionResult(
+    # Parse articles (filter out negative values), validating the whole list in one call
+    articles = ARTICLE_LIST_ADAPTER.validate_python(
+        [
+            article_data
+            for article_data in json_data.get("articles", [])
+            if not _has_negative_amount(article_data)
+        ],
+        from_attributes=True,
+    )
+
+    # Upload annotated PDF so the client can fetch it directly instead of inlining it
+    annotated_pdf_url = None
+    annotated_pdf_base64 = None
+    try:
+        annotated_pdf_url = await asyncio.to_thread(
+            _store_annotated_pdf,
+            supabase,
+            settings.invoices_bucket,
+            user_id,
+            pdf_bytes,
+            annotated_pdf_bytes,
+        )
+    except Exception:
+        # The extraction itself succeeded, inline the preview rather than failing it
+        annotated_pdf_base64 = base64.b64encode(annotated_pdf_bytes).decode("utf-8")
+
+    return ExtractionResponse(
         structured=structured,
         articles=articles,
-        annotated_pdf_base64=annotated_pdf_base64,
+        annotatedPdfUrl=annotated_pdf_url,
+        annotatedPdfBase64=annotated_pdf_base64,
+        fileName=file.filename or "invoice.pdf",
+        colorMapping=color_mapping,
     )
-
-    return {
-        "structured": extraction_result.structured.model_dump(by_alias=True),
-        "articles": [article.model_dump(by_alias=True) for article in extraction_result.articles],
-        "annotatedPdfBase64": extraction_result.annotated_pdf_base64,
-        "fileName": file.filename or "invoice.pdf",
-        "colorMapping": color_mapping,
-    }
@@ -2,16 +2,21 @@
 
 from __future__ import annotations
 
+import asyncio
 import io
 import zipfile
+from collections import deque
+from typing import AsyncIterator
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
 from fastapi.responses import StreamingResponse
+from postgrest import ReturnMethod
 
-from invoice_analyst.domain.models import Article, InvoiceSavePayload, InvoiceTotals
+from invoice_analyst.domain.models import InvoiceSavePayload
 from invoice_analyst.services.persistence import persist_invoice
-from invoice_analyst.services.storage import delete_pdf
+from invoice_analyst.services.storage import annotated_pdf_path, delete_pdf
 
+from ..cache import invalidate_user_caches
 from ..config import Settings, get_settings, get_supabase
 from ..schemas.invoice import (
     BulkDownloadRequest,
@@ -22,6 +27,41 @@ from ..schemas.invoice import (
 
 router = APIRouter(prefix="/invoices", tags=["invoices"])
 
+# PDFs fetched ahead of the zip writer, bounds both storage concurrency and buffered bytes
+DOWNLOAD_CONCURRENCY = 8
+
+
+class _ZipChunkSink(io.RawIOBase):
+    """Write-only, non-seekable stream collecting zip bytes until they are drained."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _stream_zip(files: AsyncIterator[tuple[str, bytes]]) -> AsyncIterator[bytes]:
+    """Yield a zip archive piece by piece, one member at a time, without buffering it whole."""
+    sink = _ZipChunkSink()
+    # PDFs are already Flate-compressed internally, deflating them again only burns CPU
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zip_file:
+        async for file_name, content in files:
+            zip_file.writestr(file_name, content)
+            yield sink.drain()
+    # Central directory written on close
+    yield sink.drain()
+
 
 @router.post("", response_model=InvoiceSaveResponse, summary="Persist invoice data")
 async def save_invoice(
@@ -40,9 +80,6 @@ async def save_invoice(
     if not pdf_bytes:
         raise HTTPException(status_code=400, detail="Le fichier PDF est vide")
 
-    totals = InvoiceTotals.model_validate(payload.totals.model_dump())
-    articles = [Article.model_validate(item, from_attributes=True) for item in payload.articles]
-
     domain_payload = InvoiceSavePayload(
         user_id=payload.userId,
         invoice_number=payload.invoiceNumber,
@@ -50,23 +87,37 @@ async def save_invoice(
         supplier_name=payload.supplierName,
         supplier_address=payload.supplierAddress,
         filename=payload.filename or file.filename or "facture.pdf",
-        totals=totals,
+        totals=payload.totals,
         package_count=payload.packageCount,
-        articles=articles,
+        articles=payload.articles,
     )
 
-    invoice_id, invoice_url = persist_invoice(
+    # Storage upload and row inserts are blocking, keep them off the event loop
+    invoice_id, invoice_url = await asyncio.to_thread(
+        persist_invoice,
         supabase=supabase,
         payload=domain_payload,
         pdf_bytes=pdf_bytes,
         bucket=settings.invoices_bucket,
     )
+    invalidate_user_caches(payload.userId)
+
+    # The extraction preview of this PDF is no longer needed once the invoice is saved
+    try:
+        await asyncio.to_thread(
+            delete_pdf,
+            supabase=supabase,
+            bucket=settings.invoices_bucket,
+            file_path=annotated_pdf_path(payload.userId, pdf_bytes),
+        )
+    except Exception:
+        pass  # Stale previews are also pruned on later extractions
 
     return InvoiceSaveResponse(invoiceUrl=invoice_url, invoiceId=invoice_id)
 
 
 @router.post("/delete", summary="Delete invoices in bulk")
-async def delete_invoices(
+def delete_invoices(
     payload: InvoiceDeleteRequest,
     supabase=Depends(get_supabase),
     settings: Settings = Depends(get_settings),
@@ -75,30 +126,33 @@ async def delete_invoices(
     if not ids:
         return {"deleted": 0}
 
-    factures = (
-        supabase.table("factures")
-        .select("id, nom_fichier")
+    # Lines first (no cascade on facture_id), then the invoices, whose deleted rows give the
+    # file names for storage paths without a preliminary SELECT
+    (
+        supabase.table("lignes_facture")
+        .delete(returning=ReturnMethod.minimal)
         .eq("user_id", payload.userId)
-        .in_("id", ids)
+        .in_("facture_id", ids)
         .execute()
     )
-    data = factures.data or []
-    if not data:
-        return {"deleted": 0}
+    factures = (
+        supabase.table("factures").delete().eq("user_id", payload.userId).in_("id", ids).execute()
+    )
+    # Returned rows are exactly the deleted ones, an empty list when nothing matched
+    rows = factures.data or []
 
     storage_paths = [
         f"{payload.userId}/{item['id']}_{item['nom_fichier']}"
-        for item in data
+        for item in rows
         if item.get("nom_fichier")
     ]
 
-    supabase.table("lignes_facture").delete().in_("facture_id", ids).execute()
-    supabase.table("factures").delete().in_("id", ids).execute()
-
     if storage_paths:
         supabase.storage.from_(settings.invoices_bucket).remove(storage_paths)
+    if rows:
+        invalidate_user_caches(payload.userId)
 
-    return {"deleted": len(data)}
+    return {"deleted": len(rows)}
 
 
 @router.post("/download", summary="Download invoices as a zip archive")
@@ -110,33 +164,50 @@ async def download_invoices(
     if not payload.invoiceIds:
         raise HTTPException(status_code=400, detail="invoiceIds must not be empty")
 
-    factures = (
+    factures = await asyncio.to_thread(
         supabase.table("factures")
         .select("id, nom_fichier")
         .eq("user_id", payload.userId)
         .in_("id", payload.invoiceIds)
-        .execute()
+        .execute
     )
     data = factures.data or []
     if not data:
         raise HTTPException(status_code=404, detail="Invoices not found")
 
     storage_client = supabase.storage.from_(settings.invoices_bucket)
-    buffer = io.BytesIO()
-    with zipfile.ZipFile(buffer, "w") as zip_file:
-        for item in data:
-            file_name = item.get("nom_fichier")
-            if not file_name:
-                continue
-            storage_path = f"{payload.userId}/{item['id']}_{file_name}"
-            try:
-                pdf_bytes = storage_client.download(storage_path)
-            except Exception:
-                continue
-            zip_file.writestr(file_name, pdf_bytes)
-    buffer.seek(0)
+
+    async def download(storage_path: str) -> bytes | None:
+        try:
+            return await asyncio.to_thread(storage_client.download, storage_path)
+        except Exception:
+            return None
+
+    async def iter_pdfs() -> AsyncIterator[tuple[str, bytes]]:
+        # Keep up to DOWNLOAD_CONCURRENCY downloads in flight, yielding them in request order
+        pending: deque[tuple[str, asyncio.Task]] = deque()
+        try:
+            for item in data:
+                file_name = item.get("nom_fichier")
+                if not file_name:
+                    continue
+                storage_path = f"{payload.userId}/{item['id']}_{file_name}"
+                pending.append((file_name, asyncio.create_task(download(storage_path))))
+                if len(pending) >= DOWNLOAD_CONCURRENCY:
+                    name, task = pending.popleft()
+                    if (pdf_bytes := await task) is not None:
+                        yield name, pdf_bytes
+            while pending:
+                name, task = pending.popleft()
+                if (pdf_bytes := await task) is not None:
+                    yield name, pdf_bytes
+        finally:
+            # Client went away mid-stream
+            for _, task in pending:
+                task.cancel()
+
     return StreamingResponse(
-        buffer,
+        _stream_zip(iter_pdfs()),
         media_type="application/zip",
         headers={"Content-Disposition": 'attachment; filename="factures.zip"'},
     )
@@ -1,5 +1,6 @@
 """API schema exports."""
 
+from .extraction import ExtractionResponse
 from .invoice import (
     BulkDownloadRequest,
     InvoiceDeleteRequest,
@@ -9,6 +10,7 @@ from .invoice import (
 
 __all__ = [
     "BulkDownloadRequest",
+    "ExtractionResponse",
     "InvoiceDeleteRequest",
     "InvoiceSaveRequest",
     "InvoiceSaveResponse",
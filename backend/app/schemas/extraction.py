@@ -0,0 +1,20 @@
+"""API schemas for extraction endpoints."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from invoice_analyst.domain.models import Article, StructuredInvoice
+
+
+class ExtractionResponse(BaseModel):
+    """Extraction payload returned to the web client."""
+
+    structured: StructuredInvoice
+    articles: List[Article]
+    annotatedPdfUrl: Optional[str] = None
+    annotatedPdfBase64: Optional[str] = None
+    fileName: str
+    colorMapping: Dict[str, Any]
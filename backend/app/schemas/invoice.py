@@ -3,11 +3,11 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import Any, Dict, List, Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
-from invoice_analyst.domain.models import InvoiceTotals
+from invoice_analyst.domain.models import Article, InvoiceTotals
 
 
 class InvoiceSaveRequest(BaseModel):
@@ -19,7 +19,7 @@ class InvoiceSaveRequest(BaseModel):
     filename: str
     totals: InvoiceTotals
     packageCount: Optional[int] = Field(default=None, ge=0)
-    articles: List[Dict[str, Any]]
+    articles: List[Article]
 
 
 class InvoiceSaveResponse(BaseModel):
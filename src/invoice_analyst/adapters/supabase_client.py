@@ -3,10 +3,20 @@
 from __future__ import annotations
 
 from functools import lru_cache
-from supabase import Client, create_client
+
+import httpx
+from supabase import Client, ClientOptions, create_client
+
+# PostgREST and storage calls go to the same host: a single pooled HTTP/2 client lets
+# them share keep-alive connections instead of each sub-client opening its own
+HTTP_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
 
 
 @lru_cache(maxsize=1)
 def get_supabase_client(url: str, key: str) -> Client:
     """Return a cached Supabase client for the given credentials."""
-    return create_client(url, key)
+    http_client = httpx.Client(
+        http2=True, timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS, follow_redirects=True
+    )
+    return create_client(url, key, options=ClientOptions(httpx_client=http_client))
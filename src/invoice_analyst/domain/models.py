@@ -2,11 +2,32 @@
 
 from __future__ import annotations
 
+import re
 from datetime import date, datetime
 from typing import Iterable, List, Optional
 
 from pydantic import BaseModel, Field, computed_field, field_validator
 
+# Year-first or day-first dates, "-" or "/" separated (day-first common in EU invoices)
+_DATE_PATTERN = re.compile(
+    r"(\d{4})([-/])(\d{1,2})\2(\d{1,2})|(\d{1,2})([-/])(\d{1,2})\6(\d{4})", re.ASCII
+)
+
+
+def parse_invoice_date(text: str) -> date:
+    """Parse an invoice date with a single regex match instead of trying formats one by one.
+
+    Raises:
+        ValueError: If the text is not a valid date in a supported layout.
+    """
+    match = _DATE_PATTERN.fullmatch(text.strip())
+    if match is None:
+        raise ValueError(f"Invalid date format: {text!r}")
+    year, _, month, day, day_first, _, month_first, year_last = match.groups()
+    if year is None:
+        year, month, day = year_last, month_first, day_first
+    return date(int(year), int(month), int(day))
+
 
 class SupplierInfo(BaseModel):
     """Supplier metadata extracted from an invoice."""
@@ -85,13 +106,10 @@ class StructuredInvoice(BaseModel):
         if isinstance(value, datetime):
             return value.date()
         if isinstance(value, str):
-            text = value.strip()
-            # Try multiple formats (day-first common in EU invoices)
-            for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d"):  # extend as needed
-                try:
-                    return datetime.strptime(text, fmt).date()
-                except ValueError:
-                    continue
+            try:
+                return parse_invoice_date(value)
+            except ValueError:
+                pass
         raise ValueError("Invalid date format for invoice_date")
 
     @field_validator("invoice_date", mode="after")
@@ -0,0 +1,99 @@
+"""Content-addressable disk cache for LLM extraction results."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+# Extractions are deterministic for a given input, a week covers re-uploads and retries
+DEFAULT_TTL = 7 * 24 * 60 * 60
+# Entries are a few kB each, the oldest are dropped beyond this count
+DEFAULT_MAX_ENTRIES = 1000
+
+
+def extraction_cache_key(pdf_bytes: bytes, *context: Any) -> str:
+    """Hash the PDF content together with everything else that shapes the extraction.
+
+    Args:
+        pdf_bytes: Raw PDF content
+        *context: JSON-serializable values the LLM output depends on (model, vocabulary...)
+
+    Returns:
+        Hex SHA-256 digest usable as a file name
+    """
+    digest = hashlib.sha256()
+    # Length prefix keeps the PDF/context boundary unambiguous
+    digest.update(len(pdf_bytes).to_bytes(8, "big"))
+    digest.update(pdf_bytes)
+    digest.update(orjson.dumps(context, option=orjson.OPT_SORT_KEYS))
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """JSON files named after their content key, each carrying its own expiry time.
+
+    The cache is best effort: unreadable, expired or unwritable entries behave as misses.
+    Every write prunes expired entries and keeps at most ``max_entries`` files.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self._directory = Path(directory)
+        self._ttl = ttl
+        self._max_entries = max_entries
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        path = self._directory / f"{key}.json"
+        try:
+            entry = orjson.loads(path.read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+
+        data = entry.get("data") if isinstance(entry, dict) else None
+        if not isinstance(data, dict) or entry.get("expiresAt", 0) <= time.time():
+            path.unlink(missing_ok=True)
+            return None
+        return data
+
+    def set(self, key: str, data: dict[str, Any]) -> None:
+        now = time.time()
+        entry = {"createdAt": now, "expiresAt": now + self._ttl, "data": data}
+        try:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file then rename, readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as tmp_file:
+                    tmp_file.write(orjson.dumps(entry))
+                os.replace(tmp_path, self._directory / f"{key}.json")
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._prune(now)
+        except OSError:
+            pass
+
+    def _prune(self, now: float) -> None:
+        # Entries are written once, so the file mtime is their creation time
+        entries = []
+        for path in self._directory.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        entries.sort()
+        excess = len(entries) - self._max_entries
+        for index, (created_at, path) in enumerate(entries):
+            if index >= excess and created_at + self._ttl > now:
+                break
+            path.unlink(missing_ok=True)
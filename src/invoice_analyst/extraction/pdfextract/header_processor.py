@@ -19,15 +19,11 @@ def group_by_column(
     columns = {}
 
     for block in blocks:
-        found = False
-        for col_x in list(columns.keys()):
-            if abs(block.x - col_x) < tolerance:
-                columns[col_x].append(block)
-                found = True
-                break
-
-        if not found:
+        col_x = next((x for x in columns if abs(block.x - x) < tolerance), None)
+        if col_x is None:
             columns[block.x] = [block]
+        else:
+            columns[col_x].append(block)
 
     return columns
 
@@ -118,11 +114,7 @@ def parse_cell_based_headers(
 
     headers = []
     for col_x in column_positions:
-        found = None
-        for block in sorted_blocks:
-            if abs(block.x - col_x) < tolerance:
-                found = block.text
-                break
+        found = next((b.text for b in sorted_blocks if abs(b.x - col_x) < tolerance), None)
         headers.append(found if found else "")
 
     return headers
@@ -128,15 +128,11 @@ def join_blocks_by_row(blocks: List[TextBlock], row_tolerance: float = 5.0) -> L
     rows = []
     for block in blocks:
         # Find existing row within tolerance
-        found_row = False
-        for row in rows:
-            if abs(row[0].y - block.y) < row_tolerance:
-                row.append(block)
-                found_row = True
-                break
-
-        if not found_row:
+        row = next((r for r in rows if abs(r[0].y - block.y) < row_tolerance), None)
+        if row is None:
             rows.append([block])
+        else:
+            row.append(block)
 
     # Sort rows by y-position (top to bottom)
     rows.sort(key=lambda row: min(b.y for b in row))
@@ -2,14 +2,32 @@
 
 from __future__ import annotations
 
-import json
 import time
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
+import httpx
+import orjson
 from mistralai import Mistral
 
 
+@lru_cache(maxsize=8)
+def _read_prompt_template(template_path: Path) -> str:
+    """Read a prompt template once per process, templates only change on deploy."""
+    # Try importlib.resources first (for installed packages)
+    try:
+        from importlib.resources import files
+
+        prompt_file = "invoice_extraction.txt"
+        return files("invoice_analyst.extraction.prompts").joinpath(prompt_file).read_text()
+    except Exception:
+        # Fallback to file path (for development)
+        if not template_path.exists():
+            raise FileNotFoundError(f"Prompt template not found: {template_path}")
+        return template_path.read_text()
+
+
 class MistralExtractor:
     """Extracts structured JSON data from invoice markdown using Mistral API."""
 
@@ -19,7 +37,10 @@ class MistralExtractor:
         Args:
             api_key: Mistral API key for authentication
         """
-        self.client = Mistral(api_key=api_key)
+        # HTTP/2 keeps concurrent extractions multiplexed on one pooled connection
+        self.client = Mistral(
+            api_key=api_key, client=httpx.Client(http2=True, follow_redirects=True)
+        )
         self.model = "mistral-large-latest"
         self.max_retries = 3
         self.base_delay = 2  # seconds
@@ -36,16 +57,7 @@ class MistralExtractor:
         Raises:
             FileNotFoundError: If template file doesn't exist
         """
-        # Try importlib.resources first (for installed packages)
-        try:
-            from importlib.resources import files
-            prompt_file = "invoice_extraction.txt"
-            return files("invoice_analyst.extraction.prompts").joinpath(prompt_file).read_text()
-        except Exception:
-            # Fallback to file path (for development)
-            if not template_path.exists():
-                raise FileNotFoundError(f"Prompt template not found: {template_path}")
-            return template_path.read_text()
+        return _read_prompt_template(template_path)
 
     def format_prompt(
         self,
@@ -170,7 +182,7 @@ class MistralExtractor:
         content = content.strip()
 
         try:
-            data = json.loads(content)
+            data = orjson.loads(content)
             return data
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             raise ValueError(f"Failed to parse JSON response: {e}\nContent: {content}")
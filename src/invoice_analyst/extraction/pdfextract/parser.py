@@ -4,6 +4,9 @@ import fitz
 from typing import List, Union
 from invoice_analyst.extraction.pdfextract.models import TextBlock
 
+# "dict" extraction flags minus embedded image data, only text spans are ever read
+TEXT_DICT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
 
 def extract_text_blocks(pdf_input: Union[bytes, str]) -> List[TextBlock]:
     """Extract all text blocks with x/y/page coordinates from PDF.
@@ -32,7 +35,7 @@ def extract_text_blocks(pdf_input: Union[bytes, str]) -> List[TextBlock]:
 
     for page_num in range(len(doc)):
         page = doc[page_num]
-        text_dict = page.get_text("dict")
+        text_dict = page.get_text("dict", flags=TEXT_DICT_FLAGS)
 
         for block in text_dict.get("blocks", []):
             if block.get("type") != 0:
@@ -1,13 +1,12 @@
 """PDF annotation for metadata highlighting."""
 
-from pydoc import text
 import fitz
-import json
-from typing import List, Dict, Any, Tuple, Union
+from typing import List, Dict, Any, Optional, Tuple, Union
 from dataclasses import dataclass
 import re
 from difflib import SequenceMatcher
 from invoice_analyst.extraction.pdfextract.models import TextBlock
+from invoice_analyst.extraction.pdfextract.parser import TEXT_DICT_FLAGS
 
 
 @dataclass
@@ -37,15 +36,30 @@ ARTICLE_INVALID_COLOR = (1.0, 0.0, 0.0)  # Red
 # Y-coordinate tolerance for same row detection
 ROW_TOLERANCE = 5.0
 
+# Same flags page.search_for() uses when it builds its own text page
+SEARCH_FLAGS = (
+    fitz.TEXT_DEHYPHENATE
+    | fitz.TEXT_PRESERVE_WHITESPACE
+    | fitz.TEXT_PRESERVE_LIGATURES
+    | fitz.TEXT_MEDIABOX_CLIP
+)
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+NUMERIC_PATTERN = re.compile(r"[\d.,]+")
+
 
 def fuzzy_match_in_text(search_value: str, text_block: str) -> bool:
     """Fuzzy match allowing small OCR and spacing differences."""
     if not search_value or not text_block:
         return False
 
-    search = re.sub(r"\s+", " ", search_value.strip().lower())
-    block = re.sub(r"\s+", " ", text_block.strip().lower())
+    return _fuzzy_match_normalized(
+        normalize_whitespace(search_value), normalize_whitespace(text_block)
+    )
+
 
+def _fuzzy_match_normalized(search: str, block: str, block_tokens: set[str] | None = None) -> bool:
+    """``fuzzy_match_in_text`` on already normalized text, with optional precomputed tokens."""
     # 1. Direct substring
     if search in block:
         return True
@@ -56,17 +70,23 @@ def fuzzy_match_in_text(search_value: str, text_block: str) -> bool:
         return True
 
     # Determine if search is numeric (contains only digits, dots, commas)
-    is_numeric = bool(re.fullmatch(r"[\d.,]+", search))
+    is_numeric = bool(NUMERIC_PATTERN.fullmatch(search))
 
     # 3. Fuzzy ratio only if it’s *not purely numeric*
+    # (real_quick_ratio/quick_ratio are cheap upper bounds of ratio, skip hopeless pairs)
     if not is_numeric:
-        ratio = SequenceMatcher(None, search, block).ratio()
-        if ratio > 0.60:
+        matcher = SequenceMatcher(None, search, block)
+        if (
+            matcher.real_quick_ratio() > 0.60
+            and matcher.quick_ratio() > 0.60
+            and matcher.ratio() > 0.60
+        ):
             return True
 
     # 4. Token-based fuzzy match (for slightly reordered or joined words)
     search_tokens = set(search.split())
-    block_tokens = set(block.split())
+    if block_tokens is None:
+        block_tokens = set(block.split())
     overlap = len(search_tokens & block_tokens) / max(len(search_tokens), 1)
     if overlap > 0.8:
         return True
@@ -104,6 +124,13 @@ def extract_metadata_fields(json_data: Dict[str, Any]) -> Dict[str, str]:
     return fields
 
 
+def _open_pdf(pdf_input: Union[bytes, str]) -> fitz.Document:
+    """Open a PDF given as bytes or file path."""
+    if isinstance(pdf_input, bytes):
+        return fitz.open(stream=pdf_input, filetype="pdf")
+    return fitz.open(pdf_input)
+
+
 def find_metadata_matches(
     pdf_input: Union[bytes, str], metadata_fields: Dict[str, str]
 ) -> List[HighlightMatch]:
@@ -116,11 +143,17 @@ def find_metadata_matches(
     Returns:
         List of HighlightMatch objects for all matches found
     """
+    doc = _open_pdf(pdf_input)
+    matches = _find_metadata_matches_in_pages(_load_pages(doc), metadata_fields)
+    doc.close()
+    return matches
+
+
+def _find_metadata_matches_in_pages(
+    pages: List["_PageText"], metadata_fields: Dict[str, str]
+) -> List[HighlightMatch]:
+    """Find metadata field matches in pages loaded with ``_load_pages``."""
     matches = []
-    if isinstance(pdf_input, bytes):
-        doc = fitz.open(stream=pdf_input, filetype="pdf")
-    else:
-        doc = fitz.open(pdf_input)
 
     for field_name, field_value in metadata_fields.items():
         if not field_value:
@@ -129,16 +162,16 @@ def find_metadata_matches(
         color = FIELD_COLORS.get(field_name, (0, 0, 1))
 
         # Search on all pages
-        for page_num in range(len(doc)):
-            page = doc[page_num]
+        for page_num, page_text in enumerate(pages):
+            page, textpage = page_text.page, page_text.textpage
 
             # Search for exact value
-            rects = page.search_for(field_value)
+            rects = page.search_for(field_value, textpage=textpage)
 
             # If not found, try with comma for numbers
             if not rects and "." in field_value:
                 field_value_alt = field_value.replace(".", ",")
-                rects = page.search_for(field_value_alt)
+                rects = page.search_for(field_value_alt, textpage=textpage)
 
             # Add all found rectangles
             for rect in rects:
@@ -151,7 +184,6 @@ def find_metadata_matches(
                     )
                 )
 
-    doc.close()
     return matches
 
 
@@ -167,63 +199,104 @@ def find_all_article_rows(
     Returns:
         List of tuples (page_number, row_bbox, row_text) for each occurrence
     """
-    if isinstance(pdf_input, bytes):
-        doc = fitz.open(stream=pdf_input, filetype="pdf")
-    else:
-        doc = fitz.open(pdf_input)
+    doc = _open_pdf(pdf_input)
+    all_rows = _find_article_rows_in_doc(_load_pages(doc), article_number)
+    doc.close()
+    return all_rows
+
+
+def _page_spans(page: fitz.Page) -> List[Tuple[float, float, Tuple[float, ...], str]]:
+    """Flatten a page's text spans to ``(center_y, x0, bbox, text)`` tuples.
+
+    "Duplicata" stamps are dropped here so row matching never sees them.
+    """
+    spans = []
+    for block in page.get_text("dict", flags=TEXT_DICT_FLAGS).get("blocks", []):
+        if block.get("type") != 0:  # Text blocks only
+            continue
+        for line in block.get("lines", []):
+            for span in line.get("spans", []):
+                text = span.get("text", "")
+                if "Duplicata" in text:
+                    continue
+                bbox = span["bbox"]
+                spans.append(((bbox[1] + bbox[3]) / 2, bbox[0], bbox, text))
+    return spans
+
+
+@dataclass
+class _PageText:
+    """A page with its search text page and lazily flattened spans."""
+
+    page: fitz.Page
+    textpage: fitz.TextPage
+    spans: Optional[List[Tuple[float, float, Tuple[float, ...], str]]] = None
+
+
+def _load_pages(doc: fitz.Document) -> List[_PageText]:
+    """Build each page's text page once so repeated searches reuse it."""
+    pages = []
+    for page in doc:
+        pages.append(_PageText(page=page, textpage=page.get_textpage(flags=SEARCH_FLAGS)))
+    return pages
+
+
+def _find_article_rows_in_doc(
+    pages: List[_PageText], article_number: str
+) -> List[Tuple[int, fitz.Rect, str]]:
+    """Find article rows in an open document.
+
+    Pages come from ``_load_pages`` so looking up many references in the same document
+    searches prebuilt text pages and flattens each page's spans at most once.
+    """
     all_rows = []
 
-    for page_idx in range(len(doc)):
-        page = doc[page_idx]
+    # Define max horizontal distance (typical invoice table width)
+    MAX_ROW_WIDTH = 600
 
+    for page_idx, page_text in enumerate(pages):
         # Search for article number on this page
-        rects = page.search_for(article_number)
+        rects = page_text.page.search_for(article_number, textpage=page_text.textpage)
+        if not rects:
+            # Skip the costly text extraction on pages without the reference
+            continue
 
-        # Get all text blocks for this page once
-        text_dict = page.get_text("dict")
+        # Get all spans for this page once
+        if page_text.spans is None:
+            page_text.spans = _page_spans(page_text.page)
+        spans = page_text.spans
 
         # Process each occurrence of the article number
         for anchor_rect in rects:
             anchor_y = (anchor_rect.y0 + anchor_rect.y1) / 2
             anchor_x = anchor_rect.x0
 
-            # Get all text blocks on same row
-            row_rects = []
+            # Collect spans on the same row within horizontal range, growing the row bbox as we go
             row_texts = []
-
-            # Define max horizontal distance (typical invoice table width)
-            MAX_ROW_WIDTH = 600
-
-            for block in text_dict.get("blocks", []):
-                if block.get("type") == 0:  # Text block
-                    for line in block.get("lines", []):
-                        for span in line.get("spans", []):
-                            span_bbox = span.get("bbox", [])
-                            span_y = (span_bbox[1] + span_bbox[3]) / 2
-                            span_x = span_bbox[0]
-
-                            # Check if on same row AND within horizontal range
-                            if abs(
-                                span_y - anchor_y
-                            ) < ROW_TOLERANCE and "Duplicata" not in span.get("text", ""):
-                                # Only include spans within reasonable horizontal distance
-                                if abs(span_x - anchor_x) < MAX_ROW_WIDTH:
-                                    row_rects.append(fitz.Rect(span_bbox))
-                                    row_texts.append(span.get("text", ""))
-
-            if row_rects:
-                # Calculate bbox covering entire row
-                min_x = min(r.x0 for r in row_rects)
-                max_x = max(r.x1 for r in row_rects)
-                min_y = min(r.y0 for r in row_rects)
-                max_y = max(r.y1 for r in row_rects)
-
+            min_x = min_y = float("inf")
+            max_x = max_y = float("-inf")
+            for span_y, span_x, bbox, text in spans:
+                if (
+                    abs(span_y - anchor_y) < ROW_TOLERANCE
+                    and abs(span_x - anchor_x) < MAX_ROW_WIDTH
+                ):
+                    row_texts.append(text)
+                    x0, y0, x1, y1 = bbox
+                    if x0 < min_x:
+                        min_x = x0
+                    if y0 < min_y:
+                        min_y = y0
+                    if x1 > max_x:
+                        max_x = x1
+                    if y1 > max_y:
+                        max_y = y1
+
+            if row_texts:
                 row_bbox = fitz.Rect(min_x, min_y, max_x, max_y)
                 row_text = " ".join(row_texts)
 
                 all_rows.append((page_idx, row_bbox, row_text))
 
-    doc.close()
     return all_rows
 
 
@@ -236,9 +309,7 @@ def normalize_whitespace(text: str) -> str:
     Returns:
         Text with normalized whitespace
     """
-    import re
-
-    return re.sub(r"\s+", " ", text.strip().lower())
+    return WHITESPACE_PATTERN.sub(" ", text.strip().lower())
 
 
 def validate_article_fields(
@@ -255,6 +326,7 @@ def validate_article_fields(
         field_name -> {"Extractor": extractor_value, "pdf": pdf_value_or_not_found}
     """
     row_text_normalized = normalize_whitespace(row_text)
+    row_tokens = set(row_text_normalized.split())
     discrepancies = {}
 
     # 5 required fields
@@ -276,7 +348,7 @@ def validate_article_fields(
 
         value_str = normalize_whitespace(str(field_value))
 
-        if fuzzy_match_in_text(value_str, row_text_normalized):
+        if value_str and _fuzzy_match_normalized(value_str, row_text_normalized, row_tokens):
             continue
 
         # Field not found - record discrepancy
@@ -298,6 +370,16 @@ def find_article_matches(
     Returns:
         List of tuples (HighlightMatch, discrepancies_dict) for article rows
     """
+    doc = _open_pdf(pdf_input)
+    matches = _find_article_matches_in_pages(_load_pages(doc), articles)
+    doc.close()
+    return matches
+
+
+def _find_article_matches_in_pages(
+    pages: List["_PageText"], articles: List[Dict[str, Any]]
+) -> List[Tuple[HighlightMatch, Dict[str, Dict[str, str]]]]:
+    """Find and validate articles in pages loaded with ``_load_pages``."""
     matches = []
 
     # Group articles by reference to handle duplicates
@@ -308,14 +390,12 @@ def find_article_matches(
             print(f"Warning: Article missing Reference field, skipping")
             continue
 
-        if article_number not in article_groups:
-            article_groups[article_number] = []
-        article_groups[article_number].append(article)
+        article_groups.setdefault(article_number, []).append(article)
 
     # Process each unique article reference
     for article_number, article_list in article_groups.items():
         # Find all rows in PDF with this article number
-        all_rows = find_all_article_rows(pdf_input, article_number)
+        all_rows = _find_article_rows_in_doc(pages, article_number)
 
         if not all_rows:
             print(f"Warning: Article {article_number} not found in PDF")
@@ -419,7 +499,7 @@ def extract_text_blocks_from_pdf(pdf_input: Union[bytes, str]) -> List[TextBlock
 
     for page_num in range(len(doc)):
         page = doc[page_num]
-        text_dict = page.get_text("dict")
+        text_dict = page.get_text("dict", flags=TEXT_DICT_FLAGS)
 
         for block in text_dict.get("blocks", []):
             if block.get("type") == 0:  # Text block
@@ -456,35 +536,40 @@ def generate_color_mapping(
         - metadata_colors: Dict mapping field names to RGB colors (as hex strings)
         - article_colors: List of RGB colors (as hex strings) for each article
     """
+    metadata_fields = extract_metadata_fields(json_data)
+    articles = json_data.get("articles", [])
+    article_matches_with_discrepancies = find_article_matches(pdf_input, articles)
+    return _build_color_mapping(metadata_fields, articles, article_matches_with_discrepancies)
 
-    def rgb_to_hex(rgb: Tuple[float, float, float]) -> str:
-        """Convert RGB tuple (0-1 range) to hex color string."""
-        r = int(rgb[0] * 255)
-        g = int(rgb[1] * 255)
-        b = int(rgb[2] * 255)
-        return f"#{r:02x}{g:02x}{b:02x}"
 
-    # Extract metadata fields
-    metadata_fields = extract_metadata_fields(json_data)
+def _rgb_to_hex(rgb: Tuple[float, float, float]) -> str:
+    """Convert RGB tuple (0-1 range) to hex color string."""
+    r = int(rgb[0] * 255)
+    g = int(rgb[1] * 255)
+    b = int(rgb[2] * 255)
+    return f"#{r:02x}{g:02x}{b:02x}"
 
+
+def _build_color_mapping(
+    metadata_fields: Dict[str, str],
+    articles: List[Dict[str, Any]],
+    article_matches_with_discrepancies: List[Tuple[HighlightMatch, Dict[str, Dict[str, str]]]],
+) -> Dict[str, Any]:
+    """Build the color mapping from already computed article matches."""
     # Build metadata color mapping
     metadata_colors = {}
     for field_name in metadata_fields.keys():
         color = FIELD_COLORS.get(field_name, (0, 0, 1))
-        metadata_colors[field_name] = rgb_to_hex(color)
-
-    # Find article matches to determine colors
-    articles = json_data.get("articles", [])
-    article_matches_with_discrepancies = find_article_matches(pdf_input, articles)
+        metadata_colors[field_name] = _rgb_to_hex(color)
 
     # Build article color list (one color per article in order)
     article_colors = []
     for match, discrepancies in article_matches_with_discrepancies:
-        article_colors.append(rgb_to_hex(match.color))
+        article_colors.append(_rgb_to_hex(match.color))
 
     # Fill remaining articles with default valid color if they weren't found in PDF
     while len(article_colors) < len(articles):
-        article_colors.append(rgb_to_hex(ARTICLE_VALID_COLOR))
+        article_colors.append(_rgb_to_hex(ARTICLE_VALID_COLOR))
 
     return {"metadata_colors": metadata_colors, "article_colors": article_colors}
 
@@ -502,37 +587,54 @@ def annotate_pdf(pdf_input: Union[bytes, str], json_data: Dict[str, Any]) -> byt
     Raises:
         Exception: If annotation fails
     """
-    # Extract metadata fields
-    metadata_fields = extract_metadata_fields(json_data)
+    annotated_pdf, _ = annotate_pdf_with_color_mapping(pdf_input, json_data)
+    return annotated_pdf
 
-    # Find metadata matches
-    metadata_matches = find_metadata_matches(pdf_input, metadata_fields)
 
-    # Find article matches
-    articles = json_data.get("articles", [])
-    article_matches_with_discrepancies = find_article_matches(pdf_input, articles)
+def annotate_pdf_with_color_mapping(
+    pdf_input: Union[bytes, str], json_data: Dict[str, Any]
+) -> Tuple[bytes, Dict[str, Any]]:
+    """Generate the annotated PDF and the color mapping from a single matching pass.
+
+    Args:
+        pdf_input: PDF as bytes or file path
+        json_data: Dictionary with Mistral extraction results
+
+    Returns:
+        Tuple (annotated PDF as bytes, color mapping as in ``generate_color_mapping``)
 
-    # Open PDF for annotation
+    Raises:
+        Exception: If annotation fails
+    """
+    # Open PDF once for matching and annotation
     try:
-        if isinstance(pdf_input, bytes):
-            doc = fitz.open(stream=pdf_input, filetype="pdf")
-        else:
-            doc = fitz.open(pdf_input)
+        doc = _open_pdf(pdf_input)
     except FileNotFoundError:
         raise FileNotFoundError(f"PDF file not found: {pdf_input}")
     except Exception as e:
         raise Exception(f"Failed to open PDF: {e}")
+    pages = _load_pages(doc)
+
+    # Extract metadata fields
+    metadata_fields = extract_metadata_fields(json_data)
+
+    # Find metadata matches
+    metadata_matches = _find_metadata_matches_in_pages(pages, metadata_fields)
+
+    # Find article matches
+    articles = json_data.get("articles", [])
+    article_matches_with_discrepancies = _find_article_matches_in_pages(pages, articles)
 
     # Draw metadata highlights
     for match in metadata_matches:
-        page = doc[match.page]
+        page = pages[match.page].page
         rect = fitz.Rect(match.bbox)
 
         page.draw_rect(rect, color=match.color, fill=match.color, fill_opacity=0.3, width=0)
 
     # Draw article highlights and add sticky notes for invalid articles
     for match, discrepancies in article_matches_with_discrepancies:
-        page = doc[match.page]
+        page = pages[match.page].page
         rect = fitz.Rect(match.bbox)
 
         # Draw highlight
@@ -542,7 +644,11 @@ def annotate_pdf(pdf_input: Union[bytes, str], json_data: Dict[str, Any]) -> byt
         if discrepancies:
             create_sticky_note(page, match.bbox, discrepancies)
 
+    color_mapping = _build_color_mapping(
+        metadata_fields, articles, article_matches_with_discrepancies
+    )
+
     # Return annotated PDF as bytes
     pdf_bytes = doc.tobytes()
     doc.close()
-    return pdf_bytes
+    return pdf_bytes, color_mapping
@@ -1,9 +1,12 @@
 """Utility functions for text matching and processing."""
 
 import re
-from typing import List
+from typing import Dict, List, Tuple
 from invoice_analyst.extraction.pdfextract.models import TextBlock
 
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
 
 def fuzzy_match_headers(actual: List[str], expected: List[str], threshold: float = 0.7) -> bool:
     """Fuzzy match headers ignoring special characters and accents.
@@ -21,8 +24,8 @@ def fuzzy_match_headers(actual: List[str], expected: List[str], threshold: float
 
     matches = 0
     for act, exp in zip(actual, expected):
-        act_clean = re.sub(r"[^\w\s]", "", act.lower())
-        exp_clean = re.sub(r"[^\w\s]", "", exp.lower())
+        act_clean = PUNCTUATION_PATTERN.sub("", act.lower())
+        exp_clean = PUNCTUATION_PATTERN.sub("", exp.lower())
 
         act_norm = act_clean.replace(" ", "").replace("é", "e").replace("è", "e")
         exp_norm = exp_clean.replace(" ", "").replace("é", "e").replace("è", "e")
@@ -43,7 +46,7 @@ def normalize_text(text: str) -> str:
     Returns:
         Normalized text
     """
-    text = re.sub(r"\s+", " ", text)
+    text = WHITESPACE_PATTERN.sub(" ", text)
     text = text.strip()
     return text
 
@@ -58,24 +61,23 @@ def filter_non_table_blocks(all_blocks: List[TextBlock], tables: List) -> List[T
     Returns:
         Text blocks that are NOT part of any table
     """
+    # Vertical extent of each table per page, computed once instead of once per block
+    table_ranges: Dict[int, List[Tuple[float, float]]] = {}
+    for table in tables:
+        # Find end_y of table (last row's y position or use large value)
+        if table.rows:
+            table_end_y = max(row.y for row in table.rows) + 20  # Add buffer
+        else:
+            table_end_y = table.start_y + 100  # Default buffer
+        table_ranges.setdefault(table.page, []).append((table.start_y, table_end_y))
+
     info_blocks = []
 
     for block in all_blocks:
-        is_in_table = False
-
-        for table in tables:
-            # Check if block is within table boundaries
-            if block.page == table.page and block.y >= table.start_y:
-                # Find end_y of table (last row's y position or use large value)
-                if table.rows:
-                    table_end_y = max(row.y for row in table.rows) + 20  # Add buffer
-                else:
-                    table_end_y = table.start_y + 100  # Default buffer
-
-                if block.y <= table_end_y:
-                    is_in_table = True
-                    break
-
+        # Check if block is within table boundaries
+        is_in_table = any(
+            start_y <= block.y <= end_y for start_y, end_y in table_ranges.get(block.page, ())
+        )
         if not is_in_table:
             info_blocks.append(block)
 
@@ -119,5 +121,5 @@ def normalize_cell_text(text: str) -> str:
     # Strip leading/trailing whitespace
     text = text.strip()
     # Replace all whitespace sequences (spaces, tabs, newlines) with single space
-    text = re.sub(r"\s+", " ", text)
+    text = WHITESPACE_PATTERN.sub(" ", text)
     return text
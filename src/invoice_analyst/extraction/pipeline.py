@@ -2,9 +2,11 @@
 
 from __future__ import annotations
 
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
+from invoice_analyst.extraction.cache import ExtractionCache, extraction_cache_key
 from invoice_analyst.extraction.pdfextract.parser import extract_text_blocks
 from invoice_analyst.extraction.pdfextract.detector import (
     find_matching_template_from_directory,
@@ -19,10 +21,13 @@ from invoice_analyst.extraction.pdfextract.utils import (
     deduplicate_blocks,
 )
 from invoice_analyst.extraction.pdfextract.mistral_extractor import MistralExtractor
-from invoice_analyst.extraction.pdfextract.pdf_annotator import (
-    annotate_pdf,
-    generate_color_mapping,
-)
+from invoice_analyst.extraction.pdfextract.pdf_annotator import annotate_pdf_with_color_mapping
+
+
+@lru_cache(maxsize=8)
+def get_mistral_extractor(api_key: str) -> MistralExtractor:
+    """Return a cached extractor so the Mistral SDK's HTTP connection pool is reused."""
+    return MistralExtractor(api_key)
 
 
 def process_pdf_pipeline(
@@ -31,6 +36,8 @@ def process_pdf_pipeline(
     templates_dir: str = "templates",
     known_brands: list[str] | None = None,
     known_categories: list[str] | None = None,
+    cache_dir: str | None = None,
+    refresh_cache: bool = False,
 ) -> dict[str, Any]:
     """Process PDF invoice with automatic supplier detection.
 
@@ -40,6 +47,8 @@ def process_pdf_pipeline(
         templates_dir: Path to templates directory (default: "templates")
         known_brands: List of known brand names from database for LLM context
         known_categories: List of known category names from database for LLM context
+        cache_dir: Directory of the extraction cache, disabled when None
+        refresh_cache: Ignore any cached result and overwrite it with a fresh extraction
 
     Returns:
         Dictionary with processing results:
@@ -85,22 +94,37 @@ def process_pdf_pipeline(
         # Generate info markdown
         info_markdown = generate_info_markdown(deduplicated_info)
 
-        # Extract JSON using Mistral API
-        extractor = MistralExtractor(mistral_api_key)
+        # Extract JSON using Mistral API, unless this exact PDF and context were seen before
+        extractor = get_mistral_extractor(mistral_api_key)
         prompt_path = Path(__file__).parent / "prompts" / "invoice_extraction.txt"
-        invoice_data = extractor.extract_json(
+        cache = ExtractionCache(cache_dir) if cache_dir else None
+        # Key on the prompt and markdown actually sent, so editing the prompt or a supplier
+        # template invalidates earlier entries
+        cache_key = extraction_cache_key(
+            pdf_bytes,
+            extractor.model,
+            extractor.load_prompt_template(prompt_path),
             info_markdown,
             table_markdown,
-            prompt_path,
-            known_brands=known_brands or [],
-            known_categories=known_categories or [],
+            known_brands or [],
+            known_categories or [],
+        )
+        invoice_data = cache.get(cache_key) if cache and not refresh_cache else None
+        if invoice_data is None:
+            invoice_data = extractor.extract_json(
+                info_markdown,
+                table_markdown,
+                prompt_path,
+                known_brands=known_brands or [],
+                known_categories=known_categories or [],
+            )
+            if cache:
+                cache.set(cache_key, invoice_data)
+
+        # Generate annotated PDF and color mapping for frontend highlighting in one pass
+        annotated_pdf_bytes, color_mapping = annotate_pdf_with_color_mapping(
+            pdf_bytes, invoice_data
         )
-
-        # Generate annotated PDF
-        annotated_pdf_bytes = annotate_pdf(pdf_bytes, invoice_data)
-
-        # Generate color mapping for frontend highlighting
-        color_mapping = generate_color_mapping(pdf_bytes, invoice_data)
 
         return {
             "success": True,
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 from typing import Optional
 
+from postgrest import ReturnMethod
 from supabase import Client
 
 from invoice_analyst.domain.models import Article, InvoiceSavePayload
@@ -24,7 +25,8 @@ def _merge_duplicate_articles(articles: list[Article]) -> list[Article]:
             continue
 
         if key not in article_map:
-            article_map[key] = article.model_copy(deep=True)
+            # Fields are immutable scalars, a shallow copy is enough to mutate totals safely
+            article_map[key] = article.model_copy()
         else:
             existing = article_map[key]
             # Sum numeric fields
@@ -60,9 +62,9 @@ def _get_or_create_supplier(
     supplier_id = _get_single_id(result)
     if supplier_id:
         if address:
-            supabase.table("fournisseurs").update({"adresse": address}).eq(
-                "id", supplier_id
-            ).execute()
+            supabase.table("fournisseurs").update(
+                {"adresse": address}, returning=ReturnMethod.minimal
+            ).eq("id", supplier_id).execute()
         return supplier_id
 
     response = (
@@ -132,7 +134,8 @@ def _get_or_create_product(
                 "designation": article.designation,
                 "categorie_id": category_id,
                 "marque_id": brand_id,
-            }
+            },
+            returning=ReturnMethod.minimal,
         ).eq("id", product_id).execute()
         return product_id
 
@@ -193,7 +196,9 @@ def _upsert_invoice(
         if invoice_id is None:
             raise RuntimeError("Unable to create invoice")
     else:
-        supabase.table("factures").update(data).eq("id", invoice_id).execute()
+        supabase.table("factures").update(data, returning=ReturnMethod.minimal).eq(
+            "id", invoice_id
+        ).execute()
 
     object_name = f"{user_id}/{invoice_id}_{payload.filename}"
     stored_file = store_pdf(
@@ -213,16 +218,17 @@ def persist_invoice(
     bucket: str = "invoices",
 ) -> tuple[int, str]:
     """Persist invoice metadata and related products, returning the invoice id and storage URL."""
+    user_id = payload.user_id
     supplier_id = _get_or_create_supplier(
         supabase=supabase,
-        user_id=payload.user_id,
+        user_id=user_id,
         name=payload.supplier_name,
         address=payload.supplier_address,
     )
 
     invoice_id, stored_file = _upsert_invoice(
         supabase=supabase,
-        user_id=payload.user_id,
+        user_id=user_id,
         supplier_id=supplier_id,
         payload=payload,
         pdf_bytes=pdf_bytes,
@@ -230,34 +236,46 @@ def persist_invoice(
     )
 
     # remove existing lines for id to avoid duplicates
-    supabase.table("lignes_facture").delete().eq("facture_id", invoice_id).execute()
+    supabase.table("lignes_facture").delete(returning=ReturnMethod.minimal).eq(
+        "facture_id", invoice_id
+    ).execute()
 
     # Merge duplicate articles before persisting
     merged_articles = _merge_duplicate_articles(payload.articles)
 
+    # Articles of an invoice share a handful of categories and brands, resolve each name once
+    category_ids: dict[Optional[str], Optional[int]] = {}
+    brand_ids: dict[Optional[str], Optional[int]] = {}
+    line_rows: list[dict] = []
+
     for article in merged_articles:
-        category_id = _get_or_create_category(
-            supabase=supabase,
-            user_id=payload.user_id,
-            name=article.category,
-        )
-        brand_id = _get_or_create_brand(
-            supabase=supabase,
-            user_id=payload.user_id,
-            name=article.brand,
-        )
+        category, brand = article.category, article.brand
+        if category not in category_ids:
+            category_ids[category] = _get_or_create_category(
+                supabase=supabase,
+                user_id=user_id,
+                name=category,
+            )
+        if brand not in brand_ids:
+            brand_ids[brand] = _get_or_create_brand(
+                supabase=supabase,
+                user_id=user_id,
+                name=brand,
+            )
+        category_id = category_ids[category]
+        brand_id = brand_ids[brand]
         product_id = _get_or_create_product(
             supabase=supabase,
-            user_id=payload.user_id,
+            user_id=user_id,
             supplier_id=supplier_id,
             article=article,
             category_id=category_id,
             brand_id=brand_id,
         )
 
-        supabase.table("lignes_facture").insert(
+        line_rows.append(
             {
-                "user_id": payload.user_id,
+                "user_id": user_id,
                 "facture_id": invoice_id,
                 "produit_id": product_id,
                 "prix_unitaire": article.unit_price,
@@ -267,6 +285,10 @@ def persist_invoice(
                 "unite": article.unit,
                 "poids_volume": article.poids_volume,
             }
-        ).execute()
+        )
+
+    # Insert every invoice line in a single request
+    if line_rows:
+        supabase.table("lignes_facture").insert(line_rows, returning=ReturnMethod.minimal).execute()
 
     return invoice_id, stored_file.url
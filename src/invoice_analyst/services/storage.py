@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
+import hashlib
 from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 
 from urllib.parse import urljoin
 
@@ -27,19 +29,20 @@ def store_pdf(
     signed_url_ttl: int = DEFAULT_SIGNED_URL_TTL,
 ) -> StoredFile:
     """Upload the PDF if needed and return storage metadata."""
+    bucket_client = supabase.storage.from_(bucket)
     folder = "/".join(file_path.split("/")[:-1])
-    files = supabase.storage.from_(bucket).list(folder)
+    files = bucket_client.list(folder)
     existing_names = {file.get("name") for file in files if file.get("name")}
     base_name = file_path.split("/")[-1]
 
     if base_name not in existing_names:
-        supabase.storage.from_(bucket).upload(
+        bucket_client.upload(
             path=file_path,
             file=content,
             file_options={"content_type": content_type},
         )
 
-    url_data = supabase.storage.from_(bucket).create_signed_url(file_path, signed_url_ttl)
+    url_data = bucket_client.create_signed_url(file_path, signed_url_ttl)
     url = url_data.get("signedURL") or url_data.get("url")
     if not url:
         raise RuntimeError(f"Unable to create signed URL for {file_path}")
@@ -68,3 +71,26 @@ def create_signed_url(
     if not url:
         raise RuntimeError(f"Unable to create signed URL for {file_path}")
     return url
+
+
+def annotated_pdf_path(user_id: str, pdf_bytes: bytes) -> str:
+    """Storage path of a PDF's annotated preview, the same for every extraction of that PDF."""
+    return f"{user_id}/annotated/{hashlib.sha256(pdf_bytes).hexdigest()}.pdf"
+
+
+def remove_files_older_than(
+    *, supabase: Client, bucket: str, folder: str, max_age: int, limit: int = 100
+) -> None:
+    """Remove up to ``limit`` files of ``folder`` created more than ``max_age`` seconds ago."""
+    bucket_client = supabase.storage.from_(bucket)
+    files = bucket_client.list(
+        folder, {"limit": limit, "sortBy": {"column": "created_at", "order": "asc"}}
+    )
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age)
+    stale_paths = [
+        f"{folder}/{file['name']}"
+        for file in files
+        if file.get("created_at") and datetime.fromisoformat(file["created_at"]) < cutoff
+    ]
+    if stale_paths:
+        bucket_client.remove(stale_paths)